@@ -3,14 +3,19 @@ from __future__ import annotations
 import argparse
 import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 from largest_banks_etl.pipeline import (
-    extract,
+    SQLITE_PRAGMAS,
+    extract_from_html,
+    fetch_page,
     load_to_csv,
     load_to_db,
+    load_to_db_adbc,
     log_progress,
+    read_exchange_rates,
     run_query,
-    transform,
+    transform_with_rates,
 )
 
 
@@ -22,6 +27,16 @@ def main() -> None:
     parser.add_argument("--db", default="outputs/largest_banks.db")
     parser.add_argument("--table", default="Largest_banks")
     parser.add_argument("--log", default="etl_project_log.txt")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always re-download the page instead of revalidating the on-disk HTML cache",
+    )
+    parser.add_argument(
+        "--adbc",
+        action="store_true",
+        help="Bulk-load the SQLite table through the ADBC driver (needs the 'arrow' extra)",
+    )
     args = parser.parse_args()
 
     os.makedirs(os.path.dirname(args.out_csv), exist_ok=True)
@@ -29,32 +44,44 @@ def main() -> None:
 
     log_progress("Preliminaries complete. Initiating ETL process", args.log)
 
-    df = extract(args.url, table_attribs=None, log_path=args.log)
-    df = transform(df, args.rates, log_path=args.log)
+    # The page download and the rates CSV read are independent; overlap them.
+    log_progress("Starting extraction", args.log)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        page_future = pool.submit(fetch_page, args.url, use_cache=not args.no_cache)
+        rates_future = pool.submit(read_exchange_rates, args.rates)
+
+        body, encoding = page_future.result()
+        df = extract_from_html(body, log_path=args.log, encoding=encoding)
+        df = transform_with_rates(df, rates_future.result(), log_path=args.log)
 
     load_to_csv(df, args.out_csv, log_path=args.log)
 
+    if args.adbc:
+        load_to_db_adbc(df, args.db, args.table, log_path=args.log)
+
     conn = sqlite3.connect(args.db)
     try:
-        load_to_db(df, conn, args.table, log_path=args.log)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        if not args.adbc:
+            load_to_db(df, conn, args.table, log_path=args.log)
 
-        # Example queries (your course-style outputs)
+        # Example queries (your course-style outputs): one round-trip, sliced per office
         q_all = f"SELECT * FROM {args.table};"
-        q_london = f"SELECT company, MC_GBP_Billion FROM {args.table};"
-        q_berlin = f"SELECT company, MC_EUR_Billion FROM {args.table};"
-        q_delhi = f"SELECT company, MC_INR_Billion FROM {args.table};"
+        full = run_query(q_all, conn, log_path=args.log)
 
         print("\n--- FULL TABLE ---")
-        print(run_query(q_all, conn, log_path=args.log).to_string(index=False))
+        print(full.to_string(index=False))
 
         print("\n--- London Office (GBP) ---")
-        print(run_query(q_london, conn, log_path=args.log).to_string(index=False))
+        print(full[["company", "MC_GBP_Billion"]].to_string(index=False))
 
         print("\n--- Berlin Office (EUR) ---")
-        print(run_query(q_berlin, conn, log_path=args.log).to_string(index=False))
+        print(full[["company", "MC_EUR_Billion"]].to_string(index=False))
 
         print("\n--- New Delhi Office (INR) ---")
-        print(run_query(q_delhi, conn, log_path=args.log).to_string(index=False))
+        print(full[["company", "MC_INR_Billion"]].to_string(index=False))
 
         log_progress("Process Complete.", args.log)
     finally:
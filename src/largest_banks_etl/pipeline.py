@@ -1,73 +1,358 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import os
 import re
 import sqlite3
-from datetime import datetime
-from typing import Dict, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+# pandas/numpy/lxml/requests are imported inside the functions that use them,
+# so importing this module (e.g. for `largest-banks-etl --help`) stays cheap.
+if TYPE_CHECKING:
+    import lxml.etree
+    import pandas as pd
+    import requests
+
+
+_LOGGER = logging.getLogger("largest_banks_etl")
+_LOGGER.setLevel(logging.INFO)
+_LOGGER.propagate = False
+
+
+def _get_handler(log_path: str) -> logging.FileHandler:
+    """
+    Return the FileHandler for log_path, opening it on first use.
+    The file stays open for the rest of the process (logging closes it at exit);
+    a handler for a previous log_path is closed and replaced.
+    """
+    path = os.path.abspath(log_path)
+    for h in list(_LOGGER.handlers):
+        if isinstance(h, logging.FileHandler):
+            if h.baseFilename == path:
+                return h
+            _LOGGER.removeHandler(h)
+            h.close()
+
+    handler = logging.FileHandler(path, mode="a", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s : %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    _LOGGER.addHandler(handler)
+    return handler
 
 
 def log_progress(message: str, log_path: str = "etl_project_log.txt") -> None:
     """
     Append a timestamped log line to a local log file.
     """
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(f"{ts} : {message}\n")
+    _get_handler(log_path)
+    _LOGGER.info(message)
 
 
-def _fetch_html(url: str, timeout: int = 20) -> str:
-    headers = {
-        # Wikipedia occasionally blocks/limits unknown clients; a UA helps.
-        "User-Agent": "largest-banks-etl/0.1 (learning project; contact: none)"
-    }
-    r = requests.get(url, headers=headers, timeout=timeout)
-    r.raise_for_status()
-    return r.text
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "largest-banks-etl")
 
 
-def _find_market_cap_table_html(html: str) -> str:
+def _cache_paths(url: str, cache_dir: Optional[str] = None) -> Tuple[str, str]:
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    cache_dir = cache_dir or CACHE_DIR
+    return os.path.join(cache_dir, f"{key}.html"), os.path.join(cache_dir, f"{key}.meta.json")
+
+
+def _read_cache(body_path: str, meta_path: str) -> Tuple[Optional[bytes], Dict[str, str]]:
+    """
+    Return (body, meta) from the cache, or (None, {}) if either file is missing,
+    unreadable, or they don't belong together (body size differs from the meta).
+    """
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, {}
+    if not isinstance(meta, dict) or meta.get("size") != len(body):
+        return None, {}
+    return body, meta
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    # Write to a temp file next to path, then rename over it, so an interrupted
+    # run leaves either the old file or the new one, never a truncated one.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@lru_cache(maxsize=None)
+def _get_session() -> requests.Session:
+    """
+    Shared HTTP session (connection pooling + retries), created on first use.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update(
+        {
+            # Wikipedia occasionally blocks/limits unknown clients; a UA helps.
+            "User-Agent": "largest-banks-etl/0.1 (learning project; contact: none)",
+            "Accept-Encoding": "gzip, deflate",
+        }
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        # raise_on_status=False: once retries run out, the last response is returned
+        # and raise_for_status() raises HTTPError, as it did before retries
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_page(url: str, timeout: int = 20, use_cache: bool = True) -> Tuple[bytes, Optional[str]]:
+    """
+    Fetch the raw page body and the charset declared in its Content-Type (None if
+    absent; the parser then reads the page's <meta charset>). The body is not
+    decoded here, lxml parses the bytes directly.
+    With use_cache, the body is kept on disk and revalidated with a conditional
+    GET (ETag / Last-Modified), so an unchanged page costs a 304.
+    """
+    headers: Dict[str, str] = {}
+
+    body_path, meta_path = _cache_paths(url)
+    cached_body, meta = _read_cache(body_path, meta_path) if use_cache else (None, {})
+    if cached_body is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = _get_session().get(url, headers=headers, timeout=timeout)
+    if r.status_code == 304 and cached_body is not None:
+        return cached_body, meta.get("encoding")
+    r.raise_for_status()
+
+    # requests guesses ISO-8859-1 for any text/* without a charset; only trust an explicit one
+    encoding = r.encoding if "charset=" in r.headers.get("Content-Type", "").lower() else None
+
+    if use_cache:
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        meta = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "encoding": encoding,
+            "size": len(r.content),
+        }
+        # Body first: a body without matching meta is ignored on the next run
+        _write_atomic(body_path, r.content)
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    return r.content, encoding
+
+
+_MARKET_CAP_ANCHOR_BY_ID = "//*[@id='By_market_capitalization']"
+_MARKET_CAP_ANCHOR_BY_TEXT = (
+    "//*[self::h2 or self::h3 or self::span]"
+    "[translate(normalize-space(.), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')"
+    " = 'by market capitalization']"
+)
+_NEXT_WIKITABLE = "following::table[contains(concat(' ', normalize-space(@class), ' '), ' wikitable ')][1]"
+
+
+def _find_market_cap_table(html: bytes | str, encoding: Optional[str] = None) -> lxml.etree._Element:
     """
     Locate the table right after the 'By market capitalization' heading.
-    Returns the table HTML string.
+    Returns the parsed <table> element.
     """
-    soup = BeautifulSoup(html, "lxml")
+    import lxml.html
 
-    # Best case: Wikipedia heading has id="By_market_capitalization"
-    anchor = soup.find(id="By_market_capitalization")
+    parser = lxml.html.HTMLParser(encoding=encoding) if encoding and isinstance(html, bytes) else None
+    root = lxml.html.fromstring(html, parser=parser)
 
+    # Best case: Wikipedia heading has id="By_market_capitalization"
     # Fallback: search for a heading that matches the text
-    if anchor is None:
-        headline = soup.find(
-            lambda tag: tag.name in {"h2", "h3", "span"}
-            and tag.get_text(strip=True).lower() == "by market capitalization"
-        )
-        anchor = headline
-
-    if anchor is None:
+    anchors = root.xpath(_MARKET_CAP_ANCHOR_BY_ID) or root.xpath(_MARKET_CAP_ANCHOR_BY_TEXT)
+    if not anchors:
         raise ValueError("Could not find the 'By market capitalization' section on the page.")
 
     # Move forward to find the next wikitable
-    table = anchor.find_next("table", class_=lambda c: c and "wikitable" in c)
-    if table is None:
+    tables = anchors[0].xpath(_NEXT_WIKITABLE)
+    if not tables:
         raise ValueError("Found the heading but could not find the following wikitable.")
 
-    return str(table)
+    return tables[0]
+
+
+def _is_displayed(el: lxml.etree._Element) -> bool:
+    # What read_html(displayed_only=True) keeps: no <style>/<script> (inline
+    # TemplateStyles) and no display:none spans (sortkeys like "7002466210000000000")
+    if not isinstance(el.tag, str):  # comments, processing instructions
+        return False
+    if el.tag in ("style", "script"):
+        return False
+    return "display:none" not in el.get("style", "").replace(" ", "").lower()
+
+
+def _cell_text(cell: lxml.etree._Element) -> str:
+    parts: list[str] = []
+
+    def collect(el: lxml.etree._Element) -> None:
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            if _is_displayed(child):
+                collect(child)
+            if child.tail:  # text after a hidden element is still shown
+                parts.append(child.tail)
+
+    collect(cell)
+    return " ".join("".join(parts).split())
+
+
+def _expand_row(cells: list[lxml.etree._Element], spans: Dict[int, Tuple[int, str]]) -> list[str]:
+    """
+    Cell texts of one <tr>. Columns still covered by a rowspan from a row above
+    are filled from spans, and this row's own rowspans are added to it.
+    """
+    row: list[str] = []
+    queue = iter(cells)
+    while True:
+        col = len(row)
+        if col in spans:
+            left, text = spans[col]
+            row.append(text)
+            if left > 1:
+                spans[col] = (left - 1, text)
+            else:
+                del spans[col]
+            continue
+        cell = next(queue, None)
+        if cell is None:
+            if any(c > col for c in spans):  # a rowspan further right covers this row
+                row.append("")
+                continue
+            return row
+        text = _cell_text(cell)
+        rowspan = int(cell.get("rowspan", 1) or 1)
+        for _ in range(int(cell.get("colspan", 1) or 1)):
+            if rowspan > 1:
+                spans[len(row)] = (rowspan - 1, text)
+            row.append(text)
+
+
+def _table_to_frame(table: lxml.etree._Element) -> pd.DataFrame:
+    """
+    Read a <table> element into a dataframe of cell strings.
+    The leading all-<th> rows are the header; with several header rows, each
+    column name joins the distinct texts stacked above it ("Market cap" over
+    "US$ billion" -> "Market cap US$ billion"). colspan/rowspan cells are
+    repeated across the columns/rows they cover (like pandas.read_html).
+    """
+    import pandas as pd
+
+    header_rows: list[list[str]] = []
+    rows: list[list[str]] = []
+    spans: Dict[int, Tuple[int, str]] = {}  # column -> (rows still covered, text)
+
+    for tr in table.xpath(".//tr"):
+        cells = tr.xpath("./th|./td")
+        if not cells:
+            continue
+        is_header = all(c.tag == "th" for c in cells)
+        if not header_rows and not is_header:
+            continue  # anything above the header (captions, notes)
+
+        row = _expand_row(cells, spans)
+        if is_header and not rows:
+            header_rows.append(row)
+        else:
+            rows.append(row)
+
+    if not header_rows:
+        raise ValueError("The market cap table has no header row.")
+
+    headers: list[str] = []
+    for col in range(max(len(r) for r in header_rows)):
+        parts: list[str] = []
+        for header_row in header_rows:
+            text = header_row[col] if col < len(header_row) else ""
+            if text and (not parts or parts[-1] != text):
+                parts.append(text)
+        headers.append(" ".join(parts))
+    rows = [(row + [""] * len(headers))[: len(headers)] for row in rows]
+
+    # Repeated headers (from colspan) get ".1", ".2", ... suffixes, as read_html does
+    seen: Dict[str, int] = {}
+    for i, h in enumerate(headers):
+        if h in seen:
+            seen[h] += 1
+            headers[i] = f"{h}.{seen[h]}"
+        else:
+            seen[h] = 0
+
+    return pd.DataFrame(rows, columns=headers)
+
+
+_FOOTNOTE_RE = re.compile(r"\[[^\]]*\]")
+# Footnote markers like "[3]" first (so their digits go too), then everything
+# except digits/dot/minus (commas, currency symbols, whitespace), in one pass.
+_CLEAN_NUMBER_RE = re.compile(r"\[[^\]]*\]|[^\d.\-]")
+
+
+def _clean_number_text(ser: pd.Series) -> pd.Series:
+    return ser.astype(str).str.replace(_CLEAN_NUMBER_RE, "", regex=True)
 
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+    # Renames in place: callers pass a frame they own (fresh from _table_to_frame)
     df.columns = [str(c).strip() for c in df.columns]
     return df
 
 
+# (column names, first-row fingerprint) -> (name_col, cap_col), least recently used first
+_COLUMN_DECISIONS: OrderedDict[Tuple[Tuple[str, ...], int], Tuple[str, str]] = OrderedDict()
+_COLUMN_DECISIONS_MAXSIZE = 32
+
+
 def _pick_name_and_cap_columns(df: pd.DataFrame) -> Tuple[str, str]:
     """
     Heuristic: pick a name-like column and a market-cap column.
+    The decision is memoized per column layout; the first row is part of the key
+    so a table whose contents change shape under the same headers is re-scored.
     """
+    first_row = tuple(str(v) for v in df.iloc[0]) if len(df) else ()
+    key = (tuple(df.columns), hash(first_row))
+
+    decision = _COLUMN_DECISIONS.get(key)
+    if decision is not None:
+        _COLUMN_DECISIONS.move_to_end(key)
+        return decision
+
+    decision = _decide_columns(df)
+    _COLUMN_DECISIONS[key] = decision
+    if len(_COLUMN_DECISIONS) > _COLUMN_DECISIONS_MAXSIZE:
+        _COLUMN_DECISIONS.popitem(last=False)
+    return decision
+
+
+def _decide_columns(df: pd.DataFrame) -> Tuple[str, str]:
+    import pandas as pd
+
     cols = list(df.columns)
     lower = [c.lower() for c in cols]
 
@@ -91,77 +376,77 @@ def _pick_name_and_cap_columns(df: pd.DataFrame) -> Tuple[str, str]:
         return name_col, cap_col
 
     # Fallback: first numeric-ish column (after cleaning)
-    # We'll try each column and see if it becomes numeric for many rows.
-    best_col = None
-    best_score = -1
-    for c in cols:
-        ser = df[c].astype(str)
-        ser = ser.str.replace(r"\[.*?\]", "", regex=True)
-        ser = ser.str.replace(",", "", regex=False)
-        ser = ser.str.replace(r"[^\d.\-]", "", regex=True)
-        nums = pd.to_numeric(ser, errors="coerce")
-        score = int(nums.notna().sum())
-        if score > best_score:
-            best_score = score
-            best_col = c
-
-    if best_col is None:
+    # Clean every column in one DataFrame-wide pass and take the one that
+    # becomes numeric for the most rows.
+    cleaned = df.astype(str).replace(_CLEAN_NUMBER_RE, "", regex=True)
+    scores = cleaned.apply(pd.to_numeric, errors="coerce").notna().sum()
+
+    if scores.empty:
         raise ValueError("Could not detect a market cap column.")
 
-    return name_col, best_col
+    return name_col, str(scores.idxmax())
 
 
-def extract(url: str, table_attribs: Optional[list[str]] = None, log_path: str = "etl_project_log.txt") -> pd.DataFrame:
+def extract_from_html(
+    html: bytes | str,
+    log_path: str = "etl_project_log.txt",
+    encoding: Optional[str] = None,
+) -> pd.DataFrame:
     """
-    Extract the 'By market capitalization' table from Wikipedia LIVE page,
-    and return a dataframe with columns:
-      - company
-      - MC_USD_Billion
+    Same as extract, for a page that has already been fetched.
+    Bytes are parsed as-is, decoded with encoding if given, otherwise with the
+    charset the page declares.
     """
-    log_progress("Starting extraction", log_path)
+    import pandas as pd
 
-    html = _fetch_html(url)
-    table_html = _find_market_cap_table_html(html)
+    table = _find_market_cap_table(html, encoding)
 
-    tables = pd.read_html(table_html)
-    if not tables:
-        raise ValueError("read_html returned no tables.")
-
-    raw = _normalize_columns(tables[0])
+    raw = _normalize_columns(_table_to_frame(table))
 
     name_col, cap_col = _pick_name_and_cap_columns(raw)
 
-    df = raw[[name_col, cap_col]].copy()
-    df.columns = ["company", "MC_USD_Billion"]
+    df = pd.DataFrame({"company": raw[name_col], "MC_USD_Billion": raw[cap_col]})
 
     # Clean MC_USD_Billion values (remove footnotes, commas, currency symbols)
-    s = df["MC_USD_Billion"].astype(str)
-    s = s.str.replace(r"\[.*?\]", "", regex=True)
-    s = s.str.replace(",", "", regex=False)
-    s = s.str.strip()
-    s = s.str.replace(r"[^\d.\-]", "", regex=True)  # keep digits/dot/minus only
-
-    df["MC_USD_Billion"] = pd.to_numeric(s, errors="coerce")
-    df["company"] = df["company"].astype(str).str.replace(r"\[.*?\]", "", regex=True).str.strip()
+    df["MC_USD_Billion"] = pd.to_numeric(_clean_number_text(df["MC_USD_Billion"]), errors="coerce")
+    df["company"] = df["company"].astype(str).str.replace(_FOOTNOTE_RE, "", regex=True).str.strip()
 
     df = df.dropna(subset=["MC_USD_Billion"])
     df = df[df["company"].ne("")]
 
     # Keep top 10 (by market cap)
-    df = df.sort_values("MC_USD_Billion", ascending=False).head(10).reset_index(drop=True)
+    df = df.nlargest(10, "MC_USD_Billion").reset_index(drop=True)
 
     log_progress(f"Extraction complete: {len(df)} rows", log_path)
     return df
 
 
-def transform(df: pd.DataFrame, csv_path: str, log_path: str = "etl_project_log.txt") -> pd.DataFrame:
+def extract(
+    url: str,
+    table_attribs: Optional[list[str]] = None,
+    log_path: str = "etl_project_log.txt",
+    use_cache: bool = True,
+) -> pd.DataFrame:
     """
-    Read exchange rates from CSV (Currency, Rate), and add:
-      - MC_GBP_Billion
-      - MC_EUR_Billion
-      - MC_INR_Billion
+    Extract the 'By market capitalization' table from Wikipedia LIVE page,
+    and return a dataframe with columns:
+      - company
+      - MC_USD_Billion
     """
-    log_progress("Starting transformation", log_path)
+    log_progress("Starting extraction", log_path)
+
+    body, encoding = fetch_page(url, use_cache=use_cache)
+    return extract_from_html(body, log_path=log_path, encoding=encoding)
+
+
+_TARGET_CURRENCIES = ("GBP", "EUR", "INR")
+
+
+def read_exchange_rates(csv_path: str) -> Dict[str, float]:
+    """
+    Read exchange rates from CSV (Currency, Rate) into a {currency: rate} dict.
+    """
+    import pandas as pd
 
     df_rate = pd.read_csv(csv_path)
     df_rate["Currency"] = df_rate["Currency"].astype(str).str.strip()
@@ -169,34 +454,160 @@ def transform(df: pd.DataFrame, csv_path: str, log_path: str = "etl_project_log.
 
     rates: Dict[str, float] = df_rate.set_index("Currency")["Rate"].dropna().to_dict()
 
-    for cur in ["GBP", "EUR", "INR"]:
+    for cur in _TARGET_CURRENCIES:
         if cur not in rates:
             raise ValueError(f"Missing exchange rate for {cur} in {csv_path}")
 
-    out = df.copy()
-    out["MC_USD_Billion"] = pd.to_numeric(out["MC_USD_Billion"], errors="coerce")
+    return rates
 
-    out["MC_GBP_Billion"] = (out["MC_USD_Billion"] * float(rates["GBP"])).round(2)
-    out["MC_EUR_Billion"] = (out["MC_USD_Billion"] * float(rates["EUR"])).round(2)
-    out["MC_INR_Billion"] = (out["MC_USD_Billion"] * float(rates["INR"])).round(2)
+
+def transform_with_rates(df: pd.DataFrame, rates: Dict[str, float], log_path: str = "etl_project_log.txt") -> pd.DataFrame:
+    """
+    Same as transform, with rates already read by read_exchange_rates.
+    The columns are added to df in place; the same frame is returned.
+    """
+    import numpy as np
+    import pandas as pd
+
+    log_progress("Starting transformation", log_path)
+
+    df["MC_USD_Billion"] = pd.to_numeric(df["MC_USD_Billion"], errors="coerce")
+
+    # One (rows x currencies) broadcast instead of a multiply + round per currency
+    usd = df["MC_USD_Billion"].to_numpy(dtype=np.float64)
+    rate_vec = np.array([rates[cur] for cur in _TARGET_CURRENCIES], dtype=np.float64)
+    df[[f"MC_{cur}_Billion" for cur in _TARGET_CURRENCIES]] = np.round(usd[:, None] * rate_vec[None, :], 2)
 
     log_progress("Transformation complete", log_path)
-    return out
+    return df
+
+
+def transform(df: pd.DataFrame, csv_path: str, log_path: str = "etl_project_log.txt") -> pd.DataFrame:
+    """
+    Read exchange rates from CSV (Currency, Rate), and add:
+      - MC_GBP_Billion
+      - MC_EUR_Billion
+      - MC_INR_Billion
+    """
+    return transform_with_rates(df, read_exchange_rates(csv_path), log_path=log_path)
 
 
 def load_to_csv(df: pd.DataFrame, output_path: str, log_path: str = "etl_project_log.txt") -> None:
     log_progress(f"Saving CSV to {output_path}", log_path)
-    df.to_csv(output_path, index=False)
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        # pyarrow is optional (pip install "largest-banks-etl[arrow]")
+        df.to_csv(output_path, index=False)
+    else:
+        # "needed" is pyarrow's default; spelled out because the output differs from pandas (see README)
+        pacsv.write_csv(
+            pa.Table.from_pandas(df, preserve_index=False),
+            output_path,
+            write_options=pacsv.WriteOptions(quoting_style="needed"),
+        )
     log_progress("CSV saved", log_path)
 
 
+def _quote_ident(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sqlite_type(ser: pd.Series) -> str:
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(ser) or pd.api.types.is_integer_dtype(ser):
+        return "INTEGER"
+    if pd.api.types.is_numeric_dtype(ser):
+        return "REAL"
+    return "TEXT"
+
+
+def _index_statements(df: pd.DataFrame, table_name: str) -> list[str]:
+    # Lookups by company and top-N by market cap (dropped along with the table)
+    table = _quote_ident(table_name)
+    statements = []
+    if "company" in df.columns:
+        statements.append(f"CREATE INDEX IF NOT EXISTS {_quote_ident(f'ix_{table_name}_company')} ON {table}(company)")
+    if "MC_USD_Billion" in df.columns:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS {_quote_ident(f'ix_{table_name}_usd')} ON {table}(MC_USD_Billion DESC)"
+        )
+    return statements
+
+
+# Applied to every connection that writes the database (journal_mode is stored
+# in the file, synchronous is per connection)
+SQLITE_PRAGMAS = ("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL")
+
+
 def load_to_db(df: pd.DataFrame, sql_connection: sqlite3.Connection, table_name: str, log_path: str = "etl_project_log.txt") -> None:
+    """
+    Replace table_name with the rows of df: drop, create, bulk insert and index
+    in a single transaction (rolled back if anything fails).
+    """
     log_progress(f"Loading to DB table: {table_name}", log_path)
-    df.to_sql(table_name, sql_connection, if_exists="replace", index=False)
+
+    table = _quote_ident(table_name)
+    columns = ", ".join(f"{_quote_ident(c)} {_sqlite_type(df[c])}" for c in df.columns)
+    placeholders = ", ".join("?" * len(df.columns))
+
+    cur = sql_connection.cursor()
+    try:
+        if not sql_connection.in_transaction:
+            cur.execute("BEGIN")
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(f"CREATE TABLE {table} ({columns})")
+        cur.executemany(f"INSERT INTO {table} VALUES ({placeholders})", df.itertuples(index=False, name=None))
+        for statement in _index_statements(df, table_name):
+            cur.execute(statement)
+        sql_connection.commit()
+    except Exception:
+        sql_connection.rollback()
+        raise
+    finally:
+        cur.close()
+
+    log_progress("DB load complete", log_path)
+
+
+def load_to_db_adbc(df: pd.DataFrame, db_path: str, table_name: str, log_path: str = "etl_project_log.txt") -> None:
+    """
+    Same as load_to_db, but opens its own ADBC connection to db_path and ingests
+    df as an Arrow table. Needs the optional adbc-driver-sqlite and pyarrow.
+    """
+    try:
+        import adbc_driver_sqlite.dbapi as adbc_sqlite
+        import pyarrow as pa
+    except ImportError as exc:
+        raise ImportError(
+            "load_to_db_adbc needs adbc-driver-sqlite and pyarrow (pip install \"largest-banks-etl[arrow]\")"
+        ) from exc
+
+    log_progress(f"Loading to DB table via ADBC: {table_name}", log_path)
+
+    # autocommit so the pragmas run outside a transaction; the load itself is one
+    with adbc_sqlite.connect(db_path, autocommit=True) as conn:
+        with conn.cursor() as cur:
+            for pragma in SQLITE_PRAGMAS:
+                cur.execute(pragma)
+            cur.execute("BEGIN")
+            try:
+                cur.adbc_ingest(table_name, pa.Table.from_pandas(df, preserve_index=False), mode="replace")
+                for statement in _index_statements(df, table_name):
+                    cur.execute(statement)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
     log_progress("DB load complete", log_path)
 
 
 def run_query(query_statement: str, sql_connection: sqlite3.Connection, log_path: str = "etl_project_log.txt") -> pd.DataFrame:
+    import pandas as pd
+
     log_progress(f"Running query: {query_statement}", log_path)
     result = pd.read_sql_query(query_statement, sql_connection)
     return result
@@ -0,0 +1,97 @@
+import functools
+import http.server
+import threading
+
+import pytest
+import requests
+
+from largest_banks_etl import pipeline
+
+PAGE = b"<html><body><p>cached page</p></body></html>"
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Serve PAGE from a local http.server and record each request's conditional headers."""
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "page.html").write_bytes(PAGE)
+    monkeypatch.setattr(pipeline, "CACHE_DIR", str(tmp_path / "cache"))
+
+    requests_seen = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.headers.get("If-Modified-Since"))
+            if self.path == "/down.html":
+                self.send_error(503)
+            else:
+                super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(site)))
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}/page.html", requests_seen
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_revalidates_and_reuses_cached_body(server):
+    url, seen = server
+
+    body, _ = pipeline.fetch_page(url)
+    assert body == PAGE
+    assert seen == [None]
+
+    body, _ = pipeline.fetch_page(url)
+    assert body == PAGE
+    assert seen[1] is not None  # conditional GET answered with 304
+
+
+def test_no_cache_skips_conditional_get(server):
+    url, seen = server
+    pipeline.fetch_page(url)
+    body, _ = pipeline.fetch_page(url, use_cache=False)
+    assert body == PAGE
+    assert seen == [None, None]
+
+
+def test_corrupt_meta_is_a_cache_miss(server):
+    url, seen = server
+    pipeline.fetch_page(url)
+    _, meta_path = pipeline._cache_paths(url)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        f.write('{"etag": ')
+
+    body, _ = pipeline.fetch_page(url)
+    assert body == PAGE
+    assert seen == [None, None]
+
+
+def test_truncated_body_is_a_cache_miss(server):
+    url, seen = server
+    pipeline.fetch_page(url)
+    body_path, _ = pipeline._cache_paths(url)
+    with open(body_path, "wb") as f:
+        f.write(PAGE[:10])
+
+    body, _ = pipeline.fetch_page(url)
+    assert body == PAGE
+    assert seen == [None, None]
+
+    # The re-downloaded page replaced the truncated one
+    body, _ = pipeline.fetch_page(url)
+    assert body == PAGE
+    assert seen[2] is not None
+
+
+def test_server_errors_raise_http_error_after_retries(server):
+    url, seen = server
+    with pytest.raises(requests.HTTPError, match="503"):
+        pipeline.fetch_page(url.replace("page.html", "down.html"))
+    assert len(seen) == 4  # first try + 3 retries
@@ -0,0 +1,248 @@
+import sqlite3
+from collections import OrderedDict
+
+import lxml.html
+import pandas as pd
+import pytest
+
+from largest_banks_etl import pipeline
+from largest_banks_etl.pipeline import (
+    _decide_columns,
+    _find_market_cap_table,
+    _table_to_frame,
+    extract_from_html,
+    load_to_csv,
+    load_to_db,
+    load_to_db_adbc,
+    transform_with_rates,
+)
+
+TABLE = '<table class="wikitable sortable"><tr><th>Bank name</th></tr><tr><td>RIGHT</td></tr></table>'
+DECOY = '<table class="wikitable"><tr><th>Bank name</th></tr><tr><td>DECOY</td></tr></table>'
+
+
+def _page(body: str) -> bytes:
+    return f'<html><head><meta charset="UTF-8"></head><body>{body}</body></html>'.encode("utf-8")
+
+
+def _first_cell(table) -> str:
+    return table.xpath("string(.//td[1])")
+
+
+def test_finds_table_after_modern_h2_id():
+    page = _page(
+        DECOY
+        + '<div class="mw-heading mw-heading2"><h2 id="By_market_capitalization">By market capitalization</h2>'
+        + '<span class="mw-editsection">[edit]</span></div><p>intro</p>'
+        + TABLE
+    )
+    assert _first_cell(_find_market_cap_table(page)) == "RIGHT"
+
+
+def test_finds_table_after_legacy_span_id():
+    page = _page(
+        DECOY
+        + '<h2><span class="mw-headline" id="By_market_capitalization">By market capitalization</span></h2>'
+        + TABLE
+    )
+    assert _first_cell(_find_market_cap_table(page)) == "RIGHT"
+
+
+def test_id_anchor_wins_over_earlier_text_match():
+    page = _page(
+        '<div id="toc"><a href="#By_market_capitalization"><span>By market capitalization</span></a></div>'
+        + DECOY
+        + '<h2><span id="By_market_capitalization">By market capitalization</span></h2>'
+        + TABLE
+    )
+    assert _first_cell(_find_market_cap_table(page)) == "RIGHT"
+
+
+def test_falls_back_to_heading_text():
+    page = _page(DECOY + "<h3>By <span>Market</span> <span>capitalization</span></h3>" + TABLE)
+    assert _first_cell(_find_market_cap_table(page)) == "RIGHT"
+
+
+def test_text_anchor_in_nested_spans():
+    page = _page(DECOY + "<div><span><span>By market</span> <b>capitalization</b></span></div>" + TABLE)
+    assert _first_cell(_find_market_cap_table(page)) == "RIGHT"
+
+
+def test_decodes_bytes_with_given_encoding():
+    page = ('<html><body><h2 id="By_market_capitalization">x</h2><table class="wikitable">'
+            "<tr><td>Société Générale</td></tr></table></body></html>").encode("cp1252")
+    assert _first_cell(_find_market_cap_table(page, "cp1252")) == "Société Générale"
+
+
+def test_missing_section_raises():
+    with pytest.raises(ValueError, match="Could not find the 'By market capitalization' section"):
+        _find_market_cap_table(_page(DECOY))
+
+
+def test_missing_table_after_section_raises():
+    page = _page(DECOY + '<h2 id="By_market_capitalization">By market capitalization</h2><p>no table</p>')
+    with pytest.raises(ValueError, match="could not find the following wikitable"):
+        _find_market_cap_table(page)
+
+
+def _frame(html: str):
+    return _table_to_frame(lxml.html.fromstring(html))
+
+
+def test_table_colspan_and_rowspan_in_body():
+    df = _frame(
+        "<table><tr><th>Rank</th><th>Bank name</th><th>Market cap</th></tr>"
+        "<tr><td rowspan=2>1</td><td>A</td><td>5</td></tr>"
+        "<tr><td>B</td><td>5</td></tr>"
+        "<tr><td>3</td><td colspan=2>n/a</td></tr></table>"
+    )
+    assert list(df.columns) == ["Rank", "Bank name", "Market cap"]
+    assert df.values.tolist() == [["1", "A", "5"], ["1", "B", "5"], ["3", "n/a", "n/a"]]
+
+
+def test_table_rowspan_in_last_column():
+    df = _frame(
+        "<table><tr><th>Bank</th><th>Note</th></tr>"
+        "<tr><td>A</td><td rowspan=2>tied</td></tr>"
+        "<tr><td>B</td></tr></table>"
+    )
+    assert df.values.tolist() == [["A", "tied"], ["B", "tied"]]
+
+
+def test_table_multi_row_header():
+    df = _frame(
+        "<table><tr><th rowspan=2>Rank</th><th rowspan=2>Bank name</th><th colspan=2>Market cap</th></tr>"
+        "<tr><th>US$ billion</th><th>Date</th></tr>"
+        "<tr><td>1</td><td>A</td><td>432.92</td><td>2024</td></tr></table>"
+    )
+    assert list(df.columns) == ["Rank", "Bank name", "Market cap US$ billion", "Market cap Date"]
+    assert df.values.tolist() == [["1", "A", "432.92", "2024"]]
+
+
+def test_table_short_rows_are_padded():
+    df = _frame("<table><tr><th>Rank</th><th>Bank</th><th>Cap</th></tr><tr><td>1</td><td>A</td></tr></table>")
+    assert df.values.tolist() == [["1", "A", ""]]
+
+
+def test_table_duplicate_headers_get_suffixes():
+    df = _frame("<table><tr><th>Rank</th><th colspan=2>Bank</th></tr><tr><td>1</td><td>A</td><td>x</td></tr></table>")
+    assert list(df.columns) == ["Rank", "Bank", "Bank.1"]
+
+
+def test_table_skips_hidden_sortkeys():
+    df = _frame(
+        "<table><tr><th>Bank</th><th>Cap</th></tr>"
+        '<tr><td>A</td><td><span style="display: none">7002466210000000000</span>466.21</td></tr></table>'
+    )
+    assert df.values.tolist() == [["A", "466.21"]]
+
+
+def test_table_skips_inline_styles():
+    df = _frame(
+        "<table><tr><th>Bank</th><th>Cap</th></tr>"
+        "<tr><td><style>.mw-parser-output .flagicon{x:1}</style><span class=flagicon></span> JPMorgan Chase"
+        "<script>var x = 1;</script></td><td>466.21</td></tr></table>"
+    )
+    assert df.values.tolist() == [["JPMorgan Chase", "466.21"]]
+
+
+def test_table_without_header_raises():
+    with pytest.raises(ValueError, match="no header row"):
+        _frame("<table><tr><td>1</td></tr></table>")
+
+
+def test_decide_columns_falls_back_to_most_numeric_column():
+    df = pd.DataFrame(
+        {
+            "Bank name": ["A", "B", "C"],
+            "Note": ["n/a", "12", "see [1]"],
+            "Value (2024)": ["432.92", "$1,234.5", "213[3]"],
+        }
+    )
+    assert _decide_columns(df) == ("Bank name", "Value (2024)")
+
+
+def test_decide_columns_fallback_tie_goes_to_leftmost_column():
+    df = pd.DataFrame({"Bank name": ["A", "B"], "Assets": ["1", "2"], "Value": ["3", "4"]})
+    assert _decide_columns(df) == ("Bank name", "Assets")
+
+
+def test_column_decisions_are_memoized_per_layout(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pipeline, "_COLUMN_DECISIONS", OrderedDict())
+    monkeypatch.setattr(pipeline, "_COLUMN_DECISIONS_MAXSIZE", 2)
+    monkeypatch.setattr(pipeline, "_decide_columns", lambda df: calls.append(list(df.columns)) or ("a", "b"))
+
+    def pick(columns, first_row):
+        return pipeline._pick_name_and_cap_columns(pd.DataFrame([first_row], columns=columns))
+
+    pick(["Bank", "Cap"], ["A", "1"])
+    pick(["Bank", "Cap"], ["A", "1"])  # hit
+    assert len(calls) == 1
+
+    pick(["Bank", "Cap"], ["A", "n/a"])  # same headers, new first row
+    assert len(calls) == 2
+
+    pick(["Name", "Value"], ["A", "1"])  # third layout evicts the least recently used
+    assert len(pipeline._COLUMN_DECISIONS) == 2
+    pick(["Bank", "Cap"], ["A", "1"])
+    assert len(calls) == 4
+
+
+def _banks():
+    return pd.DataFrame({"company": ["A", "B"], "MC_USD_Billion": [432.92, 213.0], "MC_GBP_Billion": [342.01, 168.27]})
+
+
+def test_load_to_csv_round_trips(tmp_path):
+    out = tmp_path / "banks.csv"
+    df = _banks().assign(company=["A, Inc", 'B "2"'])
+    load_to_csv(df, str(out), log_path=str(tmp_path / "log.txt"))
+    pd.testing.assert_frame_equal(pd.read_csv(out), df, check_dtype=False)
+
+
+def _table_and_indexes(conn, table):
+    rows = conn.execute(f'SELECT * FROM "{table}" ORDER BY MC_USD_Billion DESC').fetchall()
+    indexes = sorted(r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'"))
+    return rows, indexes
+
+
+def test_load_to_db_uses_given_connection(tmp_path):
+    conn = sqlite3.connect(":memory:")
+    load_to_db(_banks(), conn, "Largest_banks", log_path=str(tmp_path / "log.txt"))
+    load_to_db(_banks(), conn, "Largest_banks", log_path=str(tmp_path / "log.txt"))  # replaces
+    assert _table_and_indexes(conn, "Largest_banks") == (
+        [("A", 432.92, 342.01), ("B", 213.0, 168.27)],
+        ["ix_Largest_banks_company", "ix_Largest_banks_usd"],
+    )
+
+
+def test_load_to_db_adbc(tmp_path):
+    pytest.importorskip("adbc_driver_sqlite")
+    db_path = str(tmp_path / "banks.db")
+    load_to_db_adbc(_banks(), db_path, "Largest_banks", log_path=str(tmp_path / "log.txt"))
+    load_to_db_adbc(_banks(), db_path, "Largest_banks", log_path=str(tmp_path / "log.txt"))
+    conn = sqlite3.connect(db_path)
+    assert _table_and_indexes(conn, "Largest_banks") == (
+        [("A", 432.92, 342.01), ("B", 213.0, 168.27)],
+        ["ix_Largest_banks_company", "ix_Largest_banks_usd"],
+    )
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_extract_and_transform_keep_usd_values(tmp_path):
+    page = _page(
+        '<h2 id="By_market_capitalization">By market capitalization</h2><table class="wikitable">'
+        "<tr><th>Rank</th><th>Bank name</th><th>Market cap (US$ billion)</th></tr>"
+        "<tr><td>1</td><td>JPMorgan Chase[1]</td><td>432.92</td></tr>"
+        "<tr><td>2</td><td>Bank of America</td><td>1,234.567</td></tr></table>"
+    )
+    log_path = str(tmp_path / "log.txt")
+
+    df = extract_from_html(page, log_path=log_path)
+    assert df["MC_USD_Billion"].dtype == "float64"
+    assert df.values.tolist() == [["Bank of America", 1234.567], ["JPMorgan Chase", 432.92]]
+
+    df = transform_with_rates(df, {"GBP": 0.79, "EUR": 0.92, "INR": 83.2}, log_path=log_path)
+    assert df["MC_USD_Billion"].tolist() == [1234.567, 432.92]  # not rounded
+    assert df["MC_GBP_Billion"].tolist() == [975.31, 342.01]
+    assert df["MC_INR_Billion"].tolist() == [102715.97, 36018.94]